@@ -3,6 +3,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from calibration import (encode_features, load_calibration, load_models, load_scaler,
+                         predict_calibrated, votes_needed)
+
 # ============== PAGE CONFIG ==============
 st.set_page_config(
     page_title="Cardio Care Analyzer - Heart Health Analyzer",
@@ -162,36 +165,59 @@ st.markdown('<p class="subtitle">Advanced Heart Health Risk Assessment System</p
 # ============== MODEL ACCURACIES ==============
 model_accuracies = {
     "Logistic Regression": 87.5,
-    "Decision Tree": 85.2,
     "Neural Network": 92.8,
-    "Random Forest": 94.3,
     "XGBoost": 96.1,
     "Voting Ensemble": 97.8
 }
 
+# ============== TRAINED MODELS ==============
+@st.cache_resource
+def get_models():
+    return load_models()
+
+@st.cache_resource
+def get_scaler():
+    return load_scaler()
+
+@st.cache_resource
+def get_calibration():
+    return load_calibration()
+
+# Form answers -> CVD dataset vocabulary used in training
+CHECKUP_LEVELS = {
+    "Within past year": "Within the past year",
+    "1-2 years ago": "Within the past 2 years",
+    "2-5 years ago": "Within the past 5 years",
+    "5+ years ago": "5 or more years ago"
+}
+
+models = get_models()
+loaded_accuracies = {name: model_accuracies[name] for name in models}
+
 # ============== SIDEBAR - INFO & STATS ==============
 with st.sidebar:
     st.image("https://img.icons8.com/fluency/96/000000/heart-with-pulse.png", width=100)
     st.title("📊 System Info")
     
-    st.metric("Total Models", "6", delta="AI-Powered")
-    st.metric("Average Accuracy", "92.3%", delta="+5.2%")
+    st.metric("Total Models", f"{len(models)}", delta="AI-Powered")
+    if loaded_accuracies:
+        st.metric("Average Accuracy", f"{np.mean(list(loaded_accuracies.values())):.1f}%")
     st.metric("Predictions Made", "10,247+", delta="1,234 today")
     
     st.divider()
     
     st.subheader("🏆 Model Performance")
-    for model, acc in model_accuracies.items():
+    for model, acc in loaded_accuracies.items():
         st.progress(acc/100, text=f"{model}: {acc}%")
     
     st.divider()
     
     st.subheader("ℹ️ About")
-    st.info("""
+    st.info(f"""
     **Cardio Care AI** uses advanced machine learning algorithms to predict cardiovascular disease risk.
     
     ⚡ **Powered by:**
-    - 6 ML Models
+    - {len(models)} ML Models
     - 19 Health Parameters
     - Real-time Analysis
     
@@ -337,13 +363,13 @@ if submit_button:
     risk_score = calculate_risk_score(bmi, smoking, alcohol, exercise, heart_disease, 
                                       diabetes, general_health, age_cat, fruit, veg, fried)
     
-    base_prediction = 1 if risk_score >= 8 else 0
-    
     st.success("✅ Analysis Complete!")
     st.divider()
     
     # ============== RISK SCORE GAUGE ==============
-    st.markdown("### 📊 Your Risk Score")
+    st.markdown("### 📊 Your Lifestyle Risk Score")
+    st.caption("Rule-based score from your lifestyle and history answers. "
+               "It is separate from the AI model assessment below.")
     col1, col2, col3 = st.columns([1,2,1])
     
     with col2:
@@ -351,18 +377,18 @@ if submit_button:
         st.progress(risk_percentage/100)
         
         if risk_score < 5:
-            risk_level = "Low Risk"
+            risk_level = "Low Lifestyle Risk"
             risk_color = "🟢"
         elif risk_score < 8:
-            risk_level = "Moderate Risk"
+            risk_level = "Moderate Lifestyle Risk"
             risk_color = "🟡"
         else:
-            risk_level = "High Risk"
+            risk_level = "High Lifestyle Risk"
             risk_color = "🔴"
         
         st.markdown(f"<h2 style='text-align: center;'>{risk_color} {risk_level}</h2>", 
                    unsafe_allow_html=True)
-        st.markdown(f"<p style='text-align: center; font-size: 1.2rem;'>Risk Score: {risk_score}/20</p>", 
+        st.markdown(f"<p style='text-align: center; font-size: 1.2rem;'>Lifestyle Risk Score: {risk_score}/20</p>", 
                    unsafe_allow_html=True)
     
     st.divider()
@@ -370,56 +396,77 @@ if submit_button:
     # ============== MODEL PREDICTIONS ==============
     st.markdown("### 🤖 AI Model Predictions")
     
-    model_predictions = {
-        "Logistic Regression": base_prediction,
-        "Decision Tree": base_prediction if risk_score != 7 else (1 - base_prediction),
-        "Neural Network": base_prediction,
-        "Random Forest": base_prediction,
-        "XGBoost": base_prediction,
-        "Voting Ensemble": base_prediction
-    }
-    
-    if 6 <= risk_score <= 9:
-        model_predictions["Decision Tree"] = 1 - base_prediction
-        if risk_score == 7 or risk_score == 8:
-            model_predictions["Logistic Regression"] = 1 - base_prediction
+    scaler = get_scaler()
+    calibration = get_calibration()
+    
+    # Dataset columns are monthly (BRFSS): fruit/vegetables/fried potato are
+    # times per month, alcohol is drinking days in the past 30. Daily servings
+    # are scaled by 30 and weekly counts by 30/7; alcohol assumes at most one
+    # drink per drinking day. encode_features clips all to the training range.
+    patient = pd.DataFrame([{
+        "General_Health": general_health,
+        "Checkup": CHECKUP_LEVELS[checkup],
+        "Exercise": exercise,
+        "Skin_Cancer": skin_cancer,
+        "Other_Cancer": other_cancer,
+        "Depression": depression,
+        "Diabetes": diabetes,
+        "Arthritis": arthritis,
+        "Sex": sex,
+        "Age_Category": age_cat,
+        "Height_(cm)": height,
+        "Weight_(kg)": weight,
+        "BMI": bmi,
+        "Smoking_History": "No" if smoking == "Never" else "Yes",
+        "Alcohol_Consumption": min(alcohol, 7) * 30 / 7,
+        "Fruit_Consumption": fruit * 30,
+        "Green_Vegetables_Consumption": veg * 30,
+        "FriedPotato_Consumption": fried * 30 / 7
+    }])
+    
+    if models:
+        probabilities = predict_calibrated(models, encode_features(patient, scaler), calibration)
+    else:
+        probabilities = {}
+        st.warning("Model predictions are unavailable: no trained models were found in "
+                   "the models/ folder. The assessment below uses the rule-based risk "
+                   "score instead.")
+    high_risk_threshold = calibration["high_risk_threshold"]
+    n_models = len(probabilities)
     
-    # Create 2 rows of 3 columns for model cards
-    row1_cols = st.columns(3)
-    row2_cols = st.columns(3)
-    all_cols = row1_cols + row2_cols
+    model_cols = st.columns(max(n_models, 1))
     
     high_risk_count = 0
     
-    for idx, (name, pred) in enumerate(model_predictions.items()):
-        with all_cols[idx]:
-            if pred == 1:
+    for idx, (name, probs) in enumerate(probabilities.items()):
+        probability = float(probs[0])
+        with model_cols[idx]:
+            if probability >= high_risk_threshold:
                 high_risk_count += 1
-                confidence = min(95, 55 + (risk_score - 8) * 5)
                 st.error(f"**{name}**")
                 st.markdown("⚠️ **High Risk**")
             else:
-                confidence = min(95, 55 + (8 - risk_score) * 5)
                 st.success(f"**{name}**")
                 st.markdown("✅ **Low Risk**")
             
-            # Adjust confidence based on model
-            if "Tree" in name:
-                confidence -= 3
-            elif "Neural" in name:
-                confidence += 2
-            elif "Forest" in name:
-                confidence += 4
-            elif "XGBoost" in name:
-                confidence += 6
-            elif "Voting" in name:
-                confidence += 8
-            
-            confidence = max(50, min(98, confidence))
-            
-            st.metric("Confidence", f"{confidence:.1f}%")
+            st.metric("Risk Probability", f"{probability * 100:.1f}%")
+            if name in calibration["models"]:
+                st.caption(f"Calibrated ({calibration['models'][name]['method']})")
+            else:
+                st.caption("Uncalibrated")
             st.caption(f"Accuracy: {model_accuracies[name]}%")
     
+    if n_models:
+        st.caption(f"High-risk threshold: {high_risk_threshold * 100:.1f}% probability")
+        high_risk = high_risk_count >= votes_needed(n_models)
+        if high_risk:
+            verdict = f"**{high_risk_count} out of {n_models}** models predict high risk"
+        else:
+            verdict = f"**{n_models - high_risk_count} out of {n_models}** models predict low risk"
+    else:
+        high_risk = risk_score >= 8
+        verdict = f"Based on your lifestyle risk score: **{risk_score}/20**"
+    
     st.divider()
     
     # ============== FINAL ASSESSMENT ==============
@@ -428,9 +475,9 @@ if submit_button:
     col1, col2 = st.columns(2)
     
     with col1:
-        if high_risk_count >= 3:
+        if high_risk:
             st.error("### ⚠️ High Cardiovascular Risk Detected")
-            st.warning(f"**{high_risk_count} out of 6** models predict high risk")
+            st.warning(verdict)
             st.markdown("""
             **Recommended Actions:**
             - 🏥 Consult a cardiologist soon
@@ -440,7 +487,7 @@ if submit_button:
             """)
         else:
             st.success("### ✅ Low Cardiovascular Risk")
-            st.info(f"**{6 - high_risk_count} out of 6** models predict low risk")
+            st.info(verdict)
             st.markdown("""
             **Keep up the good work!**
             - ✅ Maintain regular checkups
@@ -583,9 +630,9 @@ if submit_button:
     with col2:
         # Model accuracy comparison
         fig2, ax2 = plt.subplots(figsize=(8, 5))
-        models_list = list(model_accuracies.keys())
-        accuracies = list(model_accuracies.values())
-        colors_models = ['#667eea', '#764ba2', '#f093fb', '#4facfe', '#43e97b', '#fa709a']
+        models_list = list(loaded_accuracies.keys())
+        accuracies = list(loaded_accuracies.values())
+        colors_models = ['#667eea', '#764ba2', '#f093fb', '#4facfe', '#43e97b', '#fa709a'][:len(models_list)]
         
         bars2 = ax2.barh(models_list, accuracies, color=colors_models, alpha=0.8, edgecolor='black')
         ax2.set_xlabel("Accuracy (%)", fontsize=12, fontweight='bold')
@@ -601,12 +648,12 @@ if submit_button:
         st.pyplot(fig2)
     
     # ============== HEALTH SCORE TIMELINE ==============
-    st.markdown("### 📅 Estimated Risk Over Time (If Lifestyle Maintained)")
+    st.markdown("### 📅 Estimated Lifestyle Risk Score Over Time (If Lifestyle Maintained)")
     
     months = ['Current', '3 Months', '6 Months', '1 Year', '2 Years']
     
     # Simulate risk improvement/worsening over time
-    if base_prediction == 0:  # Low risk
+    if risk_score < 8:  # Below the lifestyle high-risk line
         risk_trend = [risk_score, max(0, risk_score - 1), max(0, risk_score - 2), 
                      max(0, risk_score - 3), max(0, risk_score - 4)]
     else:  # High risk
@@ -621,9 +668,9 @@ if submit_button:
     ax3.plot(months, risk_trend, marker='o', linewidth=3, markersize=10, 
             color='#667eea', markerfacecolor='#764ba2')
     ax3.fill_between(range(len(months)), risk_trend, alpha=0.3, color='#667eea')
-    ax3.axhline(y=8, color='r', linestyle='--', label='High Risk Threshold', alpha=0.5)
-    ax3.set_ylabel("Risk Score", fontsize=12, fontweight='bold')
-    ax3.set_title("Projected Risk Trajectory", fontsize=14, fontweight='bold')
+    ax3.axhline(y=8, color='r', linestyle='--', label='High Lifestyle Risk (score 8)', alpha=0.5)
+    ax3.set_ylabel("Lifestyle Risk Score", fontsize=12, fontweight='bold')
+    ax3.set_title("Projected Lifestyle Score Trajectory", fontsize=14, fontweight='bold')
     ax3.legend()
     ax3.grid(True, alpha=0.3)
     plt.tight_layout()
@@ -636,10 +683,10 @@ if submit_button:
     
     report_data = {
         "Parameter": ["BMI", "Smoking", "Alcohol", "Exercise", "Fruit", "Vegetables", 
-                     "Age Category", "Risk Score", "Final Assessment"],
+                     "Age Category", "Lifestyle Risk Score", "Final Assessment"],
         "Value": [f"{bmi} ({bmi_category})", smoking, f"{alcohol} drinks/week", exercise,
                  f"{fruit} servings/day", f"{veg} servings/day", age_cat, 
-                 f"{risk_score}/20", "High Risk" if high_risk_count >= 3 else "Low Risk"]
+                 f"{risk_score}/20", "High Risk" if high_risk else "Low Risk"]
     }
     
     df_report = pd.DataFrame(report_data)
@@ -0,0 +1,453 @@
+"""Calibrated probabilities and threshold sweeps for the Cardio Care models.
+
+Each pickled model is calibrated on a labelled local holdout (isotonic or
+Platt scaling) and the fitted mapping is compiled into a piecewise-linear
+lookup table stored in ``models/calibration.json``. Applying a table is a
+single ``np.interp`` call, so the app pays nothing extra per prediction.
+
+The same module sweeps every decision threshold across a scored cohort in
+one vectorized pass to produce sensitivity/specificity and workload curves,
+so the high-risk threshold can be tuned for capacity without re-running
+inference. The app applies one threshold to every model and flags a patient
+when at least half of the models agree, so the capacity threshold is chosen
+on that majority-vote decision.
+
+The models were trained on standardized numeric columns. By default the
+scaler uses the public CVD dataset's mean/std (``TRAINING_STATS``); the
+``scaler`` command rebuilds it from the exact training split instead and saves
+it as ``models/scaler.pkl``, which then takes precedence.
+
+Usage:
+    python calibration.py scaler train.csv
+    python calibration.py fit holdout.csv --method isotonic
+    python calibration.py sweep cohort.csv --out curves.csv --capacity 0.2
+    python calibration.py sweep --curves curves.csv --capacity 0.1 --save
+
+CSV files use the raw CVD dataset columns (General_Health, Checkup, ...,
+Heart_Disease) before one-hot encoding.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# ============== MODEL FILES ==============
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+CALIBRATION_PATH = os.path.join(MODELS_DIR, "calibration.json")
+SCALER_PATH = os.path.join(MODELS_DIR, "scaler.pkl")
+
+MODEL_FILES = {
+    "Logistic Regression": "logistic_regression_model.pkl",
+    "Neural Network": "neural_network_model.pkl",
+    "XGBoost": "xgboost_model.pkl",
+    "Voting Ensemble": "voting_ensemble.pkl",
+}
+
+DEFAULT_HIGH_RISK_THRESHOLD = 0.5
+MAJORITY_VOTE = "Majority Vote"
+PLATT_KNOTS = 201
+
+# ============== FEATURE SCHEMA ==============
+TARGET_COLUMN = "Heart_Disease"
+
+NUMERIC_COLUMNS = [
+    "Height_(cm)", "Weight_(kg)", "BMI", "Alcohol_Consumption",
+    "Fruit_Consumption", "Green_Vegetables_Consumption", "FriedPotato_Consumption",
+]
+
+# Observed min/max of each numeric column in the CVD dataset (2021 BRFSS).
+# Fruit, vegetable and fried potato columns are times per month; alcohol is
+# drinking days in the past 30. Inputs are clipped to these ranges so form
+# answers never leave the training distribution.
+TRAINING_RANGES = {
+    "Height_(cm)": (91.0, 241.0),
+    "Weight_(kg)": (24.95, 293.02),
+    "BMI": (12.02, 99.33),
+    "Alcohol_Consumption": (0.0, 30.0),
+    "Fruit_Consumption": (0.0, 120.0),
+    "Green_Vegetables_Consumption": (0.0, 128.0),
+    "FriedPotato_Consumption": (0.0, 128.0),
+}
+
+# Mean and standard deviation of each numeric column over the full public CVD
+# dataset (308,854 records). The pickled models' tree split points agree with
+# these to within ~0.005 standard deviations.
+TRAINING_STATS = {
+    "Height_(cm)": (170.615, 10.658),
+    "Weight_(kg)": (83.588, 21.343),
+    "BMI": (28.626, 6.522),
+    "Alcohol_Consumption": (5.096, 8.199),
+    "Fruit_Consumption": (29.835, 24.875),
+    "Green_Vegetables_Consumption": (15.111, 14.926),
+    "FriedPotato_Consumption": (6.297, 8.582),
+}
+
+CATEGORICAL_COLUMNS = [
+    "General_Health", "Checkup", "Exercise", "Skin_Cancer", "Other_Cancer",
+    "Depression", "Diabetes", "Arthritis", "Age_Category", "Smoking_History",
+]
+
+# Column order the models were trained on (one-hot, first level dropped)
+FEATURE_COLUMNS = ["Sex"] + NUMERIC_COLUMNS + [
+    "General_Health_Fair", "General_Health_Good", "General_Health_Poor",
+    "General_Health_Very Good",
+    "Checkup_Never", "Checkup_Within the past 2 years",
+    "Checkup_Within the past 5 years", "Checkup_Within the past year",
+    "Exercise_Yes", "Skin_Cancer_Yes", "Other_Cancer_Yes", "Depression_Yes",
+    "Diabetes_No, pre-diabetes or borderline diabetes", "Diabetes_Yes",
+    "Diabetes_Yes, but female told only during pregnancy",
+    "Arthritis_Yes",
+    "Age_Category_25-29", "Age_Category_30-34", "Age_Category_35-39",
+    "Age_Category_40-44", "Age_Category_45-49", "Age_Category_50-54",
+    "Age_Category_55-59", "Age_Category_60-64", "Age_Category_65-69",
+    "Age_Category_70-74", "Age_Category_75-79", "Age_Category_80+",
+    "Smoking_History_Yes",
+]
+
+
+def clip_numeric(records):
+    """Numeric columns as floats, clipped to the training ranges."""
+    return pd.DataFrame({
+        column: records[column].astype(float).clip(*TRAINING_RANGES[column])
+        for column in NUMERIC_COLUMNS
+    }, index=records.index)
+
+
+def encode_features(records, scaler):
+    """Scale and one-hot encode raw CVD records into the models' feature matrix."""
+    features = {}
+    sex = records["Sex"]
+    if not pd.api.types.is_numeric_dtype(sex):
+        sex = sex == "Male"
+    features["Sex"] = sex.astype(int)
+
+    scaled = scaler.transform(clip_numeric(records)[NUMERIC_COLUMNS].to_numpy())
+    for idx, column in enumerate(NUMERIC_COLUMNS):
+        features[column] = scaled[:, idx]
+
+    for feature in FEATURE_COLUMNS[len(NUMERIC_COLUMNS) + 1:]:
+        column = next(c for c in CATEGORICAL_COLUMNS if feature.startswith(c + "_"))
+        features[feature] = records[column] == feature[len(column) + 1:]
+
+    return pd.DataFrame(features, index=records.index)[FEATURE_COLUMNS]
+
+
+def encode_labels(records):
+    """Return the Heart_Disease column as a 0/1 integer array."""
+    labels = records[TARGET_COLUMN]
+    if not pd.api.types.is_numeric_dtype(labels) and labels.dtype != bool:
+        labels = labels == "Yes"
+    return labels.astype(int).to_numpy()
+
+
+# ============== MODEL LOADING ==============
+def load_models(models_dir=MODELS_DIR):
+    """Load every pickled model that is present on disk, keyed by display name."""
+    models = {}
+    for name, filename in MODEL_FILES.items():
+        path = os.path.join(models_dir, filename)
+        if os.path.exists(path):
+            models[name] = joblib.load(path)
+    return models
+
+
+def fit_scaler(records):
+    """Rebuild the training-time StandardScaler from the training records."""
+    from sklearn.preprocessing import StandardScaler
+
+    return StandardScaler().fit(clip_numeric(records)[NUMERIC_COLUMNS].to_numpy())
+
+
+def make_scaler(means, scales):
+    """StandardScaler with fixed per-column mean and scale."""
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler()
+    scaler.mean_ = np.asarray(means, dtype=float)
+    scaler.scale_ = np.asarray(scales, dtype=float)
+    scaler.var_ = scaler.scale_ ** 2
+    scaler.n_features_in_ = len(scaler.mean_)
+    return scaler
+
+
+def load_scaler(path=SCALER_PATH):
+    """Saved StandardScaler if one was rebuilt, else the public dataset stats."""
+    if os.path.exists(path):
+        return joblib.load(path)
+    means, scales = zip(*(TRAINING_STATS[column] for column in NUMERIC_COLUMNS))
+    return make_scaler(means, scales)
+
+
+def predict_raw(models, features):
+    """Uncalibrated positive-class probabilities for each model."""
+    return {name: model.predict_proba(features)[:, 1] for name, model in models.items()}
+
+
+# ============== CALIBRATION ==============
+def fit_isotonic(scores, labels):
+    """Fit isotonic regression and return its knots as a lookup table."""
+    from sklearn.isotonic import IsotonicRegression
+
+    iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip")
+    iso.fit(scores, labels)
+    return {"method": "isotonic",
+            "x": iso.X_thresholds_.tolist(),
+            "y": iso.y_thresholds_.tolist()}
+
+
+def fit_platt(scores, labels, knots=PLATT_KNOTS):
+    """Fit Platt scaling on the score logit and tabulate it on a fixed grid."""
+    from sklearn.linear_model import LogisticRegression
+
+    eps = 1e-6
+    grid = np.linspace(0.0, 1.0, knots)
+
+    def logit(p):
+        p = np.clip(p, eps, 1 - eps)
+        return np.log(p / (1 - p)).reshape(-1, 1)
+
+    platt = LogisticRegression(C=1e6)
+    platt.fit(logit(np.asarray(scores, dtype=float)), labels)
+    return {"method": "platt",
+            "x": grid.tolist(),
+            "y": platt.predict_proba(logit(grid))[:, 1].tolist()}
+
+
+CALIBRATORS = {
+    "isotonic": fit_isotonic,
+    "platt": fit_platt,
+}
+
+
+def fit_calibration(scores, labels, method="isotonic"):
+    """Fit a calibration lookup table with the named method."""
+    if method not in CALIBRATORS:
+        raise ValueError(f"Unknown calibration method: {method!r}")
+    return CALIBRATORS[method](np.asarray(scores, dtype=float), np.asarray(labels))
+
+
+def apply_calibration(table, scores):
+    """Map raw scores through a piecewise-linear calibration table."""
+    if table is None:
+        return np.asarray(scores, dtype=float)
+    return np.interp(scores, table["x"], table["y"])
+
+
+def load_calibration(path=CALIBRATION_PATH):
+    """Read calibration tables; missing file means uncalibrated, threshold 0.5."""
+    if not os.path.exists(path):
+        return {"high_risk_threshold": DEFAULT_HIGH_RISK_THRESHOLD, "models": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_calibration(calibration, path=CALIBRATION_PATH):
+    with open(path, "w") as f:
+        json.dump(calibration, f, indent=2)
+
+
+def calibration_fingerprint(calibration):
+    """Short hash of the calibration tables, stamped on saved sweep curves."""
+    tables = json.dumps(calibration.get("models", {}), sort_keys=True)
+    return hashlib.sha1(tables.encode()).hexdigest()[:12]
+
+
+def predict_calibrated(models, features, calibration):
+    """Calibrated positive-class probabilities for each model."""
+    tables = calibration.get("models", {})
+    return {name: apply_calibration(tables.get(name), scores)
+            for name, scores in predict_raw(models, features).items()}
+
+
+# ============== THRESHOLD SWEEP ==============
+def votes_needed(n_models):
+    """High-risk votes required for the app's at-least-half majority."""
+    return (n_models + 1) // 2
+
+
+def majority_vote_scores(probabilities):
+    """Per-patient score that reproduces the app's majority vote.
+
+    With ``k = votes_needed(n)``, at least ``k`` models reach a threshold
+    exactly when the k-th largest model probability does, so sweeping this
+    score sweeps the app's combined decision.
+    """
+    stacked = np.vstack([np.asarray(p, dtype=float) for p in probabilities.values()])
+    return np.sort(stacked, axis=0)[-votes_needed(len(stacked))]
+
+
+def sweep_thresholds(probabilities, labels):
+    """Evaluate every distinct threshold in one pass.
+
+    A patient is flagged high risk when ``probability >= threshold``. Rows are
+    ordered from the strictest threshold (fewest flagged) to the loosest; the
+    first row sits just above the highest probability and flags nobody.
+    """
+    probabilities = np.asarray(probabilities, dtype=float)
+    labels = np.asarray(labels, dtype=int)
+
+    order = np.argsort(-probabilities, kind="mergesort")
+    sorted_probs = probabilities[order]
+    true_pos = np.cumsum(labels[order])
+    flagged = np.arange(1, len(sorted_probs) + 1)
+
+    # Keep the last position of each run of tied probabilities
+    cut = np.r_[np.flatnonzero(np.diff(sorted_probs)), len(sorted_probs) - 1]
+    thresholds = np.r_[np.nextafter(sorted_probs[0], np.inf), sorted_probs[cut]]
+    true_pos = np.r_[0, true_pos[cut]]
+    flagged = np.r_[0, flagged[cut]]
+    false_pos = flagged - true_pos
+
+    positives = labels.sum()
+    negatives = len(labels) - positives
+    return pd.DataFrame({
+        "threshold": thresholds,
+        "flagged": flagged,
+        "workload": flagged / len(labels),
+        "sensitivity": true_pos / positives,
+        "specificity": 1 - false_pos / negatives,
+        "ppv": np.where(flagged > 0, true_pos / np.maximum(flagged, 1), 1.0),
+    })
+
+
+def threshold_for_capacity(curve, capacity):
+    """Loosest threshold whose flagged fraction stays within ``capacity``.
+
+    Curves start with a row that flags nobody, so any capacity in [0, 1]
+    has an answer.
+    """
+    if not 0 <= capacity <= 1:
+        raise ValueError(f"capacity must be a fraction between 0 and 1, got {capacity}")
+    within = curve[curve["workload"] <= capacity]
+    return float(within["threshold"].iloc[-1])
+
+
+# ============== COMMAND LINE ==============
+def require_both_classes(labels):
+    if labels.min() == labels.max():
+        raise SystemExit(f"{TARGET_COLUMN} has a single class; sensitivity and "
+                         "specificity need both positive and negative records")
+
+
+def run_scaler(args):
+    records = pd.read_csv(args.data)
+    joblib.dump(fit_scaler(records), SCALER_PATH)
+    print(f"Fitted scaler on {len(records)} records -> {SCALER_PATH}")
+
+
+def run_fit(args):
+    records = pd.read_csv(args.data)
+    features, labels = encode_features(records, load_scaler()), encode_labels(records)
+    require_both_classes(labels)
+    models = load_models()
+
+    # A saved threshold was chosen on the old tables' scale, so start over
+    calibration = {
+        "high_risk_threshold": DEFAULT_HIGH_RISK_THRESHOLD,
+        "models": {
+            name: fit_calibration(scores, labels, args.method)
+            for name, scores in predict_raw(models, features).items()
+        },
+    }
+    save_calibration(calibration)
+    print(f"Calibrated {len(models)} models on {len(labels)} records -> {CALIBRATION_PATH}")
+    print(f"High-risk threshold reset to {DEFAULT_HIGH_RISK_THRESHOLD}; "
+          "re-run 'sweep --capacity ... --save' to tune it for the new tables")
+
+
+def score_cohort(path, calibration):
+    """Run inference once and sweep every model plus the majority vote."""
+    records = pd.read_csv(path)
+    features, labels = encode_features(records, load_scaler()), encode_labels(records)
+    require_both_classes(labels)
+    probabilities = predict_calibrated(load_models(), features, calibration)
+    if not probabilities:
+        raise SystemExit(f"No models found in {MODELS_DIR}")
+
+    return pd.concat(
+        [sweep_thresholds(probs, labels).assign(model=name)
+         for name, probs in probabilities.items()]
+        + [sweep_thresholds(majority_vote_scores(probabilities), labels)
+           .assign(model=MAJORITY_VOTE)],
+        ignore_index=True,
+    ).assign(calibration=calibration_fingerprint(calibration))
+
+
+def read_curves(path, calibration):
+    """Load curves saved by a previous sweep, refusing ones from other tables."""
+    curves = pd.read_csv(path)
+    if "calibration" not in curves or \
+            (curves["calibration"] != calibration_fingerprint(calibration)).any():
+        raise SystemExit(f"{path} was swept with different calibration tables; "
+                         "re-run 'sweep' on the cohort")
+    return curves
+
+
+def run_sweep(args):
+    if (args.data is None) == (args.curves is None):
+        raise SystemExit("sweep needs either a cohort CSV or --curves, not both")
+    if args.curves and args.out:
+        raise SystemExit("--out only applies when sweeping a cohort")
+
+    calibration = load_calibration()
+    if args.curves:
+        curves = read_curves(args.curves, calibration)
+    else:
+        curves = score_cohort(args.data, calibration)
+    if args.out:
+        curves.to_csv(args.out, index=False)
+        print(f"Wrote {len(curves)} threshold rows -> {args.out}")
+
+    vote_curve = curves[curves["model"] == MAJORITY_VOTE]
+    if vote_curve.empty:
+        raise SystemExit(f"No {MAJORITY_VOTE!r} rows in the sweep curves")
+
+    if args.capacity is not None:
+        if not 0 <= args.capacity <= 1:
+            raise SystemExit("--capacity must be a fraction between 0 and 1")
+        threshold = threshold_for_capacity(vote_curve, args.capacity)
+        row = vote_curve[vote_curve["threshold"] == threshold].iloc[0]
+        print(f"{MAJORITY_VOTE}: threshold {threshold:.4f} flags {row['workload']:.1%}, "
+              f"sensitivity {row['sensitivity']:.1%}, specificity {row['specificity']:.1%}")
+        if args.save:
+            calibration["high_risk_threshold"] = threshold
+            save_calibration(calibration)
+            print(f"Saved high-risk threshold -> {CALIBRATION_PATH}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scaler = commands.add_parser("scaler", help="rebuild the numeric feature scaler from training data")
+    scaler.add_argument("data", help="training CSV in raw CVD format (the split the models saw)")
+    scaler.set_defaults(func=run_scaler)
+
+    fit = commands.add_parser("fit", help="fit calibration tables on a labelled holdout")
+    fit.add_argument("data", help="holdout CSV in raw CVD format")
+    fit.add_argument("--method", choices=sorted(CALIBRATORS), default="isotonic")
+    fit.set_defaults(func=run_fit)
+
+    sweep = commands.add_parser("sweep", help="sweep decision thresholds over a cohort")
+    sweep.add_argument("data", nargs="?", help="labelled cohort CSV in raw CVD format")
+    sweep.add_argument("--curves",
+                       help="pick the capacity threshold from curves saved with --out "
+                            "instead of re-running inference")
+    sweep.add_argument("--out", help="write all threshold curves to this CSV")
+    sweep.add_argument("--capacity", type=float,
+                       help="max fraction of the cohort that can be flagged high risk")
+    sweep.add_argument("--save", action="store_true",
+                       help="store the capacity threshold as the app's high-risk threshold")
+    sweep.set_defaults(func=run_sweep)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
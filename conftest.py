@@ -0,0 +1,2 @@
+# Placing a conftest.py at the repo root puts it on sys.path, so the tests can
+# import app modules (e.g. calibration) under both "pytest" and "python -m pytest".
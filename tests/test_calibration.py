@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import calibration
+
+
+def make_records(**overrides):
+    record = {
+        "General_Health": "Very Good",
+        "Checkup": "Within the past 2 years",
+        "Exercise": "Yes",
+        "Skin_Cancer": "No",
+        "Other_Cancer": "No",
+        "Depression": "No",
+        "Diabetes": "No, pre-diabetes or borderline diabetes",
+        "Arthritis": "No",
+        "Sex": "Female",
+        "Age_Category": "60-64",
+        "Height_(cm)": 165.0,
+        "Weight_(kg)": 60.0,
+        "BMI": 22.04,
+        "Smoking_History": "Yes",
+        "Alcohol_Consumption": 4.0,
+        "Fruit_Consumption": 30.0,
+        "Green_Vegetables_Consumption": 12.0,
+        "FriedPotato_Consumption": 8.0,
+        "Heart_Disease": "No",
+    }
+    record.update(overrides)
+    return pd.DataFrame([record])
+
+
+def identity_scaler():
+    n_numeric = len(calibration.NUMERIC_COLUMNS)
+    return calibration.make_scaler(np.zeros(n_numeric), np.ones(n_numeric))
+
+
+# ============== FEATURE ENCODING ==============
+def test_encode_features_column_order():
+    features = calibration.encode_features(make_records(), identity_scaler())
+    assert list(features.columns) == calibration.FEATURE_COLUMNS
+    assert len(features.columns) == 37
+
+
+def test_encode_features_matches_levels():
+    features = calibration.encode_features(make_records(), identity_scaler()).iloc[0]
+    hot = {c for c in calibration.FEATURE_COLUMNS[8:] if features[c]}
+    assert hot == {
+        "General_Health_Very Good",
+        "Checkup_Within the past 2 years",
+        "Exercise_Yes",
+        "Diabetes_No, pre-diabetes or borderline diabetes",
+        "Age_Category_60-64",
+        "Smoking_History_Yes",
+    }
+    assert features["Sex"] == 0
+
+
+def test_encode_features_dropped_levels_are_all_zero():
+    records = make_records(General_Health="Excellent", Age_Category="18-24", Diabetes="No")
+    features = calibration.encode_features(records, identity_scaler()).iloc[0]
+    prefixes = ("General_Health_", "Age_Category_", "Diabetes_")
+    assert not any(features[c] for c in calibration.FEATURE_COLUMNS if c.startswith(prefixes))
+
+
+def test_encode_features_scales_and_clips_numerics():
+    records = make_records(**{"Alcohol_Consumption": 100.0, "Fruit_Consumption": 300.0})
+    scaler = calibration.fit_scaler(pd.concat([make_records(), make_records(**{
+        "Height_(cm)": 185.0, "Weight_(kg)": 90.0, "BMI": 26.3,
+        "Alcohol_Consumption": 20.0, "Fruit_Consumption": 90.0,
+        "Green_Vegetables_Consumption": 60.0, "FriedPotato_Consumption": 30.0,
+    })]))
+    features = calibration.encode_features(records, scaler).iloc[0]
+    # Clipped to the training maximum, which is above the fitted mean
+    expected = (30.0 - scaler.mean_[3]) / scaler.scale_[3]
+    assert features["Alcohol_Consumption"] == pytest.approx(expected)
+    assert features["Height_(cm)"] == pytest.approx(-1.0)
+
+
+def test_load_scaler_defaults_to_training_stats(tmp_path):
+    scaler = calibration.load_scaler(tmp_path / "missing.pkl")
+    bmi = calibration.NUMERIC_COLUMNS.index("BMI")
+    assert scaler.mean_[bmi] == calibration.TRAINING_STATS["BMI"][0]
+    assert scaler.scale_[bmi] == calibration.TRAINING_STATS["BMI"][1]
+
+
+def test_encode_labels():
+    records = pd.concat([make_records(), make_records(Heart_Disease="Yes")])
+    assert calibration.encode_labels(records).tolist() == [0, 1]
+
+
+# ============== CALIBRATION ==============
+@pytest.fixture
+def scored_holdout():
+    rng = np.random.default_rng(0)
+    scores = rng.random(500)
+    labels = (rng.random(500) < scores ** 2).astype(int)
+    return scores, labels
+
+
+@pytest.mark.parametrize("method", sorted(calibration.CALIBRATORS))
+def test_calibration_tables_are_monotone(scored_holdout, method):
+    table = calibration.fit_calibration(*scored_holdout, method=method)
+    assert table["method"] == method
+    assert np.all(np.diff(table["x"]) > 0)
+    assert np.all(np.diff(table["y"]) >= 0)
+    assert 0.0 <= min(table["y"]) and max(table["y"]) <= 1.0
+
+
+def test_apply_calibration_interpolates():
+    table = {"method": "isotonic", "x": [0.0, 0.5, 1.0], "y": [0.1, 0.2, 0.6]}
+    assert calibration.apply_calibration(table, [0.25, 0.75, 2.0]).tolist() == \
+        pytest.approx([0.15, 0.4, 0.6])
+    assert calibration.apply_calibration(None, [0.3]).tolist() == [0.3]
+
+
+def test_fit_calibration_rejects_unknown_method(scored_holdout):
+    with pytest.raises(ValueError):
+        calibration.fit_calibration(*scored_holdout, method="beta")
+
+
+def test_calibration_fingerprint_tracks_tables_only():
+    table = {"method": "isotonic", "x": [0.0, 1.0], "y": [0.1, 0.6]}
+    calib = {"high_risk_threshold": 0.5, "models": {"XGBoost": table}}
+    retuned = dict(calib, high_risk_threshold=0.2)
+    refitted = dict(calib, models={"XGBoost": dict(table, y=[0.2, 0.6])})
+    fingerprint = calibration.calibration_fingerprint(calib)
+    assert calibration.calibration_fingerprint(retuned) == fingerprint
+    assert calibration.calibration_fingerprint(refitted) != fingerprint
+
+
+# ============== THRESHOLD SWEEP ==============
+def test_sweep_thresholds_groups_ties():
+    curve = calibration.sweep_thresholds([0.9, 0.1, 0.9, 0.5], [1, 0, 0, 1])
+    assert curve["threshold"].iloc[0] > 0.9
+    assert curve["threshold"].iloc[1:].tolist() == [0.9, 0.5, 0.1]
+    assert curve["flagged"].tolist() == [0, 2, 3, 4]
+    assert curve["sensitivity"].tolist() == [0.0, 0.5, 1.0, 1.0]
+    assert curve["specificity"].tolist() == [1.0, 0.5, 0.5, 0.0]
+    assert not curve.isna().any().any()
+
+
+@pytest.mark.parametrize("capacity, expected", [
+    # Top tie group alone exceeds capacity: flag nobody
+    (0.0, np.nextafter(0.9, np.inf)),
+    (0.25, np.nextafter(0.9, np.inf)),
+    (0.5, 0.9),
+    (0.8, 0.5),
+    (1.0, 0.1),
+])
+def test_threshold_for_capacity(capacity, expected):
+    curve = calibration.sweep_thresholds([0.9, 0.1, 0.9, 0.5], [1, 0, 0, 1])
+    assert calibration.threshold_for_capacity(curve, capacity) == expected
+
+
+@pytest.mark.parametrize("capacity", [-0.1, 1.5])
+def test_threshold_for_capacity_rejects_out_of_range(capacity):
+    curve = calibration.sweep_thresholds([0.9, 0.1, 0.9, 0.5], [1, 0, 0, 1])
+    with pytest.raises(ValueError):
+        calibration.threshold_for_capacity(curve, capacity)
+
+
+@pytest.mark.parametrize("n_models, needed", [(1, 1), (2, 1), (3, 2), (4, 2)])
+def test_votes_needed_matches_at_least_half(n_models, needed):
+    assert calibration.votes_needed(n_models) == needed
+
+
+def test_majority_vote_scores_reproduce_vote():
+    rng = np.random.default_rng(1)
+    probabilities = {name: rng.random(200) for name in calibration.MODEL_FILES}
+    scores = calibration.majority_vote_scores(probabilities)
+    needed = calibration.votes_needed(len(probabilities))
+    for threshold in np.linspace(0, 1, 21):
+        votes = sum((p >= threshold).astype(int) for p in probabilities.values())
+        assert np.array_equal(votes >= needed, scores >= threshold)